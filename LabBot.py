@@ -19,15 +19,20 @@
 #   - bakeout control and sending of webcam photos
 
 
-from functools import wraps
+from functools import lru_cache, wraps
+import atexit
 import calendar
-import copy
 import datetime
 import datemath
 import io
 import logging
+import matplotlib
+matplotlib.use('Agg')  # graphs are only rendered to png files, no gui backend is needed
 import matplotlib.colors
+import matplotlib.dates
 import matplotlib.pyplot as plt
+import matplotlib.ticker
+import mmap
 import numpy as np
 import os
 import pandas as pd
@@ -37,24 +42,215 @@ import re
 import socket
 import sys
 import threading
-import traceback
 import telegram
 from telegram.ext import Updater, CommandHandler, MessageHandler, CallbackQueryHandler, MessageFilter, Filters
 from telegram import ChatAction
 from collections import deque
 
+try:
+    import pyarrow
+    import pyarrow.csv
+except ImportError:  # pyarrow is optional, it is only used for faster parsing of log files
+    pyarrow = None
+
 # import configuration
 import LabBot_config as cfg
 
 
+# regular expressions used for parsing of user commands
+RE_NOTIFICATION_CLEAN = re.compile(r'[^\w\s<>+-.,]')  # all special characters except '<', '>', '+', '-', '.', ','
+RE_NOTIFICATION_PLAIN = re.compile(r'[\w+,.-]+')  # tokens that RE_NOTIFICATION_CLEAN and NOTIFICATION_TRANSLATION do not split or shorten
+RE_STATUS_CLEAN = re.compile(r'[^\w\s\.]')
+RE_TIME_TOKEN = re.compile(r'[-+]?[0-9].\.?[0-9]*[YymMdDwHhSs]$|[-+]?[0-9]*\.?[0-9]*$')
+RE_TIME_UNSIGNED = re.compile(r'^([0-9]*\.?[0-9]+[YymMdDwHhSs])$')  # e.g. "20h", will get a sign prepended
+RE_ESCAPE_MARKDOWN = re.compile(r'([\*_`\[])')
+TIME_TOKEN_PREFIX = frozenset('+-.0123456789')  # time tokens can only start with these characters
+NOTIFICATION_TRANSLATION = str.maketrans({'>': ' > ', '<': ' < ', ',': '.'})
+GRADIENT_KEYWORDS = frozenset(['g', 'grad', 'gradient', 'fit', 'f', 'slope'])
+# comparison keywords for user notifications: 1 for ">" and -1 for "<"
+NOTIFICATION_COMPARISONS = {
+    '>': 1, 'g': 1, 'gt': 1, 'gr': 1,
+    '<': -1, 's': -1, 'lt': -1, 'l': -1, 'k': -1, 'kl': -1,
+}
+
+# actions for user notifications, the first keyword is used in help messages
+NOTIFICATION_ACTIONS = {
+    "deact": {'keywords': ['deact', 'dea', 'inact', 'inactivate', 'deactivate'], 'str_name': 'deactivate', 'str_todo': 'to deactivate', 'str_done': 'deactivated'},
+    "act": {'keywords': ['act', 'a', 'activate'], 'str_name': 'activate', 'str_todo': 'to activate', 'str_done': 'activated'},
+    "del": {'keywords': ['del', 'delete', 'remove'], 'str_name': 'delete', 'str_todo': 'to delete', 'str_done': 'removed'},
+}
+NOTIFICATION_ACTION_KEYWORDS = {k: action for action, a_dict in NOTIFICATION_ACTIONS.items() for k in a_dict['keywords']}
+
+
+# column names for the (lowercase) labels used in queries, reversed so that the first column wins for duplicate labels
+COLUMNS_FROM_LABELS = {val.lower(): key for key, vals in reversed(list(cfg.COLUMNS_LABELS.items())) for val in vals}
+# labels that are used for more than one column (only the first column can be queried)
+COLUMNS_LABELS_AMBIGUOUS = sorted({val.lower() for key, vals in cfg.COLUMNS_LABELS.items() for val in vals
+                                   if COLUMNS_FROM_LABELS[val.lower()] != key})
+
+
+def read_log_file_arrow(log_file):
+    """reads a complete log file using pyarrow, rows with a wrong number of columns are skipped"""
+    table = pyarrow.csv.read_csv(
+        log_file,
+        parse_options=pyarrow.csv.ParseOptions(delimiter=cfg.LOG_FILE_DELIMITER, invalid_row_handler=lambda row: 'skip'),
+        convert_options=pyarrow.csv.ConvertOptions(timestamp_parsers=[cfg.DATE_FMT_LOG]),
+    )
+    if not pyarrow.types.is_timestamp(table.schema.field(0).type):
+        raise ValueError('First column of log file {} could not be parsed as dates.'.format(log_file))
+    df = table.to_pandas()
+    df = df.set_index(df.columns[0])
+    df.index = df.index.astype('datetime64[ns]')
+    return df.astype(np.float32)
+
+
+@lru_cache(maxsize=32)
+def read_log_file(log_file, mtime_ns, size):
+    """reads a complete log file. The result is cached, the modification time (mtime_ns) and size of the file are used to invalidate
+    the cache (the size catches appends within the mtime resolution of network shares).
+    Values are stored as float32, which is precise enough for graphs and gradients and halves the memory of the cache."""
+    if pyarrow is not None:
+        try:
+            return read_log_file_arrow(log_file)
+        except (pyarrow.ArrowException, ValueError):
+            pass  # e.g. comment lines in the log file, we fall back to pandas
+    # we can use skiprows here, but I found that it doesn't really speed up things; so we average blocks of rows in read_logs
+    df = pd.read_csv(log_file,
+                     sep=cfg.LOG_FILE_DELIMITER,
+                     comment=cfg.LOG_FILE_DELIMITER_COMMENT_SYMBOL,
+                     index_col=0,
+                     memory_map=True,
+                     low_memory=False,
+                     on_bad_lines="skip")  # TODO: check if ignoring bad lines does not cause any other errors
+    # parsing all dates at once is much faster than calling strptime for every row
+    df.index = pd.to_datetime(df.index, format=cfg.DATE_FMT_LOG, cache=True)
+    return df.astype(np.float32)
+
+
+def read_log_lines(lines):
+    """parses the header and the last lines of a log file (as returned by get_first_last_from_file)"""
+    df = pd.read_csv(io.BytesIO(lines),
+                     sep=cfg.LOG_FILE_DELIMITER,
+                     comment=cfg.LOG_FILE_DELIMITER_COMMENT_SYMBOL,
+                     skiprows=[1],  # 0 are the column headers, 1 is truncated
+                     index_col=0,
+                     on_bad_lines="skip")
+    df.index = pd.to_datetime(df.index, format=cfg.DATE_FMT_LOG, cache=True)
+    return df.astype(float)
+
+
+class GraphDateFormatter(matplotlib.dates.ConciseDateFormatter):
+    """date ticks in the style of pandas time series plots: "12:00", the date below midnight ("00:00\\n14-Oct")
+    and the year below the first date"""
+    def __init__(self, locator):
+        super().__init__(locator, show_offset=False,
+                         formats=['%Y', '%b', '%d-%b', '%H:%M', '%H:%M', '%H:%M:%S'],
+                         zero_formats=['', '%Y', '%d-%b', '%H:%M\n%d-%b', '%H:%M', '%H:%M'])
+
+    def format_ticks(self, values):
+        labels = super().format_ticks(values)
+        for i, label in enumerate(labels):
+            if '\n' in label or '-' in label:  # first label that shows a date
+                labels[i] = label + matplotlib.dates.num2date(values[i]).strftime('\n%Y')
+                break
+        return labels
+
+
+def block_mean(values, n, limits):
+    """averages blocks of n consecutive rows of a 2d array, the last block can be shorter.
+    Values smaller or equal than the limits (one per column) and nan values are ignored, blocks without valid values are nan."""
+    valid = values > limits
+    starts = np.arange(0, values.shape[0], n)
+    sums = np.add.reduceat(np.where(valid, values, 0), starts, axis=0, dtype=np.float64)
+    counts = np.add.reduceat(valid, starts, axis=0, dtype=np.int64)
+    with np.errstate(invalid='ignore'):
+        return sums / counts
+
+
+# maximum number of figures that are kept for reuse (one per number of subplots)
+GRAPH_FIGURES_MAX = 4
+
+# styling of the graph axes, applied to the shared figures when they are cleared and drawn
+GRAPH_RC_PARAMS = {
+    'xtick.direction': 'in',
+    'ytick.direction': 'in',
+    'axes.grid': True,
+    'grid.alpha': 0.3,
+    'axes.xmargin': 0,  # the time axis ends at the data (or fit), as for pandas time series plots
+}
+
+# quiet hours in seconds since midnight
+QUIET_TIMES_SECONDS_START = cfg.QUIET_TIMES_HOURS_START * 3600
+QUIET_TIMES_SECONDS_END = cfg.QUIET_TIMES_HOURS_END * 3600
+
+# minimum time between two writes of the user config (configs written before this setting use the default)
+CONFIG_SAVE_EVERY_SECONDS = getattr(cfg, 'CONFIG_SAVE_EVERY_SECONDS', 120)
+
+# columns of the errors that are associated with a single column
+ERROR_COLUMNS = {error: e_dict['column']
+                 for error_dicts in (cfg.ERROR_COLUMNS_MUSTHAVE, cfg.ERROR_LIMITS_MAX, cfg.ERROR_LOWERTHAN_VALUES)
+                 for error, e_dict in error_dicts.items()}
+
+# errors for maximum limits as aligned arrays: error names, columns and limits (normal and quiet hours)
+ERROR_LIMITS_MAX_ERRORS = list(cfg.ERROR_LIMITS_MAX)
+ERROR_LIMITS_MAX_COLUMNS = [e_dict['column'] for e_dict in cfg.ERROR_LIMITS_MAX.values()]
+ERROR_LIMITS_MAX_LIMITS = np.array([e_dict['limits'] for e_dict in cfg.ERROR_LIMITS_MAX.values()], dtype=np.float64).reshape(-1, 2)
+
+# errors that are missing in one of the warning text dictionaries of the config
+WARNING_TEXTS_MISSING = sorted(
+    error for error in [*ERROR_COLUMNS, cfg.ERROR_LOWERTHAN_DEFAULT, cfg.ERROR_UNKNOWN_VALUES, 'ERROR_log_read']
+    if not (error in cfg.WARNING_MESSAGES and error in cfg.WARNING_NAMES and error in cfg.WARNING_OFF_MESSAGES)
+)
+
+# error codes of nonpositive values, keys are (column, value) and values are the errors
+ERROR_LOWERTHAN_VALUES_INDEX = {(e_dict['column'], e_dict['value']): error for error, e_dict in cfg.ERROR_LOWERTHAN_VALUES.items()}
+
+# columns of the measure requests, values are the measure entities
+MEASURE_REQUESTS_COLUMNS = {m_dict['column']: entity for entity, m_dict in cfg.MEASURE_REQUESTS.items()}
+
+# text for the help command
+HELP_MESSAGE = (
+    'Ask me for *status updates* using: "status" or "/status" or "s".\n'
+    '"s 0.5" will display the slopes for the last 0.5 hours.\n\n'
+    'Pressure, temperature and logging warnings will be sent every {:d} minutes. '
+    'Use "limits" to see warning limits.\n\n'
+    '*Active warning messages* are shown using /w or "warnings".\n\n'
+    'The active *warnings can be silenced* for n hours using the command "/silence n".\n'
+    'n=0 will re-enable normal warnings.\n\n'
+    '*Graphs* can be plotted using the "graph" keyword or "/graph" and "/g" commands. '
+    'Extra parameters are possible to specify _from_ and _to_ dates.\n'
+    'Try: "/g -3d" or "g -12h -10h"\n'
+    'Also: "/g 20" or "g 2.5d" will work as short notations.\n'
+    'The graph and status commands both support extra arguments '
+    'specifying the sensor data that should be plotted.\n'
+    '"g afm prep tafm" or "g all".\n\n'
+    'You can even do some fits in the graph module: "g tafm fit -0.5 0.5 2" for fitting of the temperature data from 0.5 hours ago to 0.5 hours into the future with a 2nd order polynomial.\n'
+    'A shortcut is "g tafm fit 0.5" for the same fit but with an order 1 polynomial as default.\n\n'
+    '*User notifications* can be set up using:\n'
+    '/n afm < 1e-10\n'
+    'n afm lt 1e-10\n'
+    'n list\n'
+    'n t < 10\n'
+    'n list\n'
+    'n del 1  _(delete notification 1)_\n'
+    'n deact all  _(deactivate all notifications)_\n'
+    'n act 1 2 3   _(activate notifications 1,2, and 3)_\n\n'
+    '*Last commands* (status and graph) can be executed using:\n'
+    '"last" or "/l 2" or ". 3 4 5"\n'
+    'List all last commands with "last list" or "l l"'
+).format(cfg.WARNING_SEND_EVERY_MINUTES)
+
+
 class LabBot:
     def __init__(self):
         self.__version__ = 0.25
 
         self.LOG_last_checked = None     # date and time of when the log was last checked
         self.LOG_data = {}               # data of one log line, keys are labels
+        self.LOG_values = np.array([])   # data of one log line as an array, in the order of LOG_labels
         self.LOG_labels = []             # labels for log data
         self.LOG_labels_nice = {}        # labels for log data with string replacements (keys are the LOG_labels)
+        self.LOG_colors = {}             # graph colors for log data (keys are the LOG_labels), reset when the labels change
         # list of users with dictionary of errors, keys are the error strings and values contain extra error information
         self.ERRORS_checks = {}
         # dictionary of errors, keys are the error strings and values contain timestamp of last written log
@@ -63,12 +259,24 @@ class LabBot:
 
         self.MEASURE_requests = {}       # dictionary containing entities to measure on command, keys are the entity
 
+        self.graph_figures = {}          # figures for graphs, keys are the number of subplots
+        self.graph_lock = threading.Lock()
+        self.timer_readlog = None
+        self.read_log_lock = threading.Lock()  # log checks should not overlap
+
+        self.log_file_state = None       # file name, modification time and size of the last parsed log file
         self.logging_filename = ""
         self.check_logging_file(force=True)
+        if COLUMNS_LABELS_AMBIGUOUS:
+            logging.warning('Labels used for more than one column in COLUMNS_LABELS: %s', ", ".join(COLUMNS_LABELS_AMBIGUOUS))
+        if WARNING_TEXTS_MISSING:
+            logging.warning('Errors missing in WARNING_MESSAGES, WARNING_NAMES or WARNING_OFF_MESSAGES: %s', ", ".join(WARNING_TEXTS_MISSING))
 
         # these class variables will be written and loaded from the configuration file
         self.config_vars = ['ERRORS_checks', 'USER_config']
-        self.save_config = False  # whether to save the config
+        self.save_config = False  # whether to save the config, changes are written in batch during the next log check
+        self.config_last_saved = None  # date and time of when the config was last saved
+        self.config_saved_data = b""  # pickled config that was last saved or loaded
 
         if os.path.isfile(cfg.USER_CONFIG_FILE):
             self.config_load()
@@ -84,6 +292,7 @@ class LabBot:
                 self.USER_config[user]['last_commands'] = deque(maxlen=cfg.NUM_SAVE_LAST_COMMANDS)
             while len(self.USER_config[user]['last_commands']) > cfg.NUM_SAVE_LAST_COMMANDS:  # in case the number is decreased in the config
                 self.USER_config[user]['last_commands'].popleft()
+        atexit.register(self.config_flush)  # pending changes are written when the program exits
 
         self.updater = Updater(token=cfg.BOT_TOKEN, use_context=True)
         self.dispatcher = self.updater.dispatcher
@@ -105,7 +314,7 @@ class LabBot:
         ]
         self.reply_markup = telegram.InlineKeyboardMarkup(self.build_menu(button_list, n_cols=4, new_cols_at=[3]))
 
-        logging.info('{} set up.'.format(cfg.BOT_ID))
+        logging.info('%s set up.', cfg.BOT_ID)
 
     def get_version(self, markdown=False):
         """returns class version information"""
@@ -146,7 +355,7 @@ class LabBot:
                 user_id = chat_id
             if user_id not in cfg.LIST_OF_USERS:
                 print("Unauthorized access denied for {}.".format(user_id))
-                logging.warning("Unauthorized access denied for {}.".format(user_id))
+                logging.warning("Unauthorized access denied for %s.", user_id)
                 return
             return func(self, update, context, *args, **kwargs)
         return wrapped
@@ -203,6 +412,16 @@ class LabBot:
             {'keywords': ['d', 'time', 'datetime', 'date', 't'], 'func': self.datetime_handler},
             {'keywords': ['last', 'l', '.'], 'func': self.last_command},
         ]
+        # keyword lookup for the message_command_handler, the first command wins for duplicate keywords
+        self.commands_strict = {}  # short keywords, these have to match the first word
+        self.commands_prefix = {}  # longer keywords, the message has to start with these; values are (priority, func)
+        for command in self.commands:
+            for c in command['keywords']:
+                if len(c) <= cfg.MESSAGE_COMMANDS_STRICT_MAXLENGTH:
+                    self.commands_strict.setdefault(c, command['func'])
+                else:
+                    self.commands_prefix.setdefault(c, (len(self.commands_prefix), command['func']))
+        self.commands_prefix_lengths = sorted({len(c) for c in self.commands_prefix})
 
         self.dispatcher.add_handler(CommandHandler(['start', 'hello', 'hi'], self.hello_handler))
         self.dispatcher.add_handler(CommandHandler('silence', self.silence_errors))  # uses args
@@ -239,7 +458,7 @@ class LabBot:
             raise context.error
         except telegram.error.Unauthorized:
             if update and update.effective_message:
-                logging.warning('Telegram error: Unauthorized user: {}'.format(update.effective_message.chat_id))
+                logging.warning('Telegram error: Unauthorized user: %s', update.effective_message.chat_id)
         except telegram.error.BadRequest:
             logging.warning('Telegram error: Bad request.')
             if update and update.effective_message:
@@ -251,21 +470,21 @@ class LabBot:
                 context.bot.send_message(chat_id=update.effective_message.chat_id, text=self.pick_random(
                     cfg.TEXTS_ERROR), parse_mode=telegram.ParseMode.MARKDOWN)
         except socket.timeout as e:
-            logging.warning('Socket timeout: {}.'.format(e))
+            logging.warning('Socket timeout: %s.', e)
         except socket.error as e:
-            logging.warning('Socket error: {}.'.format(e))
+            logging.warning('Socket error: %s.', e)
         except telegram.error.NetworkError:
             logging.warning('Telegram error: Network error.')
             if update and update.effective_message:
                 context.bot.send_message(chat_id=update.effective_message.chat_id, text=self.pick_random(
                     cfg.TEXTS_ERROR), parse_mode=telegram.ParseMode.MARKDOWN)
         except telegram.error.ChatMigrated as e:
-            logging.warning('Telegram error: Chat {} migrated to {}.'.format(update.effective_message.chat_id, e.new_chat_id))
+            logging.warning('Telegram error: Chat %s migrated to %s.', update.effective_message.chat_id, e.new_chat_id)
         except telegram.error.TelegramError as e:
             # handle all other telegram related errors
-            logging.warning('Telegram error: {}.'.format(e))
+            logging.warning('Telegram error: %s.', e)
         except telegram.vendor.ptb_urllib3.urllib3.exceptions.ReadTimeoutError as e:
-            logging.warning('Telegram error: {}.'.format(e))
+            logging.warning('Telegram error: %s.', e)
 
     def callback_handler(self, update, context):
         """handles inline button callbacks"""
@@ -304,7 +523,7 @@ class LabBot:
         """return current date and time"""
         context.bot.send_message(chat_id=update.effective_message.chat_id, text=datetime.datetime.now().strftime(
             cfg.DATE_FMT_BOT), parse_mode=telegram.ParseMode.MARKDOWN, reply_markup=self.reply_markup)
-        logging.info('Datetime sent to {}'.format(update.effective_message.chat_id))
+        logging.info('Datetime sent to %s', update.effective_message.chat_id)
 
     @restricted
     @send_action(ChatAction.TYPING)
@@ -313,33 +532,27 @@ class LabBot:
         version = self.get_version(markdown=True)
         context.bot.send_message(chat_id=update.effective_message.chat_id, text=version,
                          parse_mode=telegram.ParseMode.MARKDOWN, reply_markup=self.reply_markup)
-        logging.info('Version {} sent to {}'.format(version, update.effective_message.chat_id))
+        logging.info('Version %s sent to %s', version, update.effective_message.chat_id)
 
     @restricted
     # @send_action(ChatAction.TYPING)
     def message_command_handler(self, update, context, chat_id=0):
         """checks for possible commands in the message (without the '/' prefix"""
 
-        if not len(update.effective_message.text):
-            return False
+        text = update.effective_message.text.lower()
         args = update.effective_message.text.split()
+        if not args:
+            return False
+        func = self.commands_strict.get(args[0].lower())  # be more strict for short commands
+        if func is None:
+            matches = [self.commands_prefix[text[:n]] for n in self.commands_prefix_lengths if text[:n] in self.commands_prefix]
+            if matches:
+                func = min(matches, key=lambda match: match[0])[1]
+        if func is None:
+            self.unknown_command_handler(update, context)
+            return
 
-        if len(args) > 1:  # first arg is the command
-            args = args[1:]
-        else:
-            args = []
-        for command in self.commands:  # defined above
-            for c in command['keywords']:
-                text = update.effective_message.text
-                if len(c) <= cfg.MESSAGE_COMMANDS_STRICT_MAXLENGTH:  # be more strict for short commands
-                    text = text.split()[0].lower()
-                else:
-                    text = text[0:len(c)].lower()
-                if c == text:
-                    command['func'](update, context, args=args)
-                    return
-
-        self.unknown_command_handler(update, context)
+        func(update, context, args=args[1:])  # first arg is the command
 
     def build_menu(self, buttons,
                    n_cols,
@@ -365,39 +578,36 @@ class LabBot:
                 raise ValueError('No chat_id and no update object is provided.')
         return chat_id
 
-    def str2date(self, x):
-        """convert string from log to datetime object"""
-        return datetime.datetime.strptime(x, cfg.DATE_FMT_LOG)
-
     def escape_markdown(self, text):
         """Escape telegram markup symbols."""
-        return re.sub(r'([\*_`\[])', r'\\\1', text)
+        return RE_ESCAPE_MARKDOWN.sub(r'\\\1', text)
 
     def pick_random(self, elements):
         """returns random element from elements"""
-        return elements[random.randint(0, len(elements) - 1)]
+        return random.choice(elements)
 
     def get_column_name(self, query, default=False):
         """returns column label associated with query"""
-        query = query.lower()
-        for key, vals in cfg.COLUMNS_LABELS.items():
-            for val in vals:
-                if val.lower() == query:  # if val.lower() in query or key.lower() in query:
-                    return key
-        return default
-
-    def replace_lowerthan(self, log_data):
-        """replaces negative values with error codes; also replace nan values"""
-        for c, val in log_data.items():
-            if val in cfg.VALUES_REPLACE.keys():
-                log_data[c] = cfg.VALUES_REPLACE[val]
-            elif val != val and 'nan' in cfg.VALUES_REPLACE:  # nan
-                log_data[c] = cfg.VALUES_REPLACE['nan']
-        return log_data
-
-    def date_format_bot(self, this_date):
+        return COLUMNS_FROM_LABELS.get(query.lower(), default)
+
+    def replace_lowerthan_value(self, val):
+        """replaces a negative value with its error code; also replaces nan values"""
+        if val != val:  # nan
+            return cfg.VALUES_REPLACE.get('nan', val)
+        return cfg.VALUES_REPLACE.get(val, val)
+
+    def get_colors(self):
+        """returns dictionary of graph colors for the log labels, they are only recalculated when the labels change"""
+        if not self.LOG_colors:
+            palette = plt.cm.tab20(np.linspace(0, 1, max(len(self.LOG_labels), 1)))
+            self.LOG_colors = {c: matplotlib.colors.rgb2hex(palette[i][0:3]) for i, c in enumerate(self.LOG_labels)}
+        return self.LOG_colors
+
+    def date_format_bot(self, this_date, now=None):
         """returns a formatted date according to the config"""
-        if datetime.datetime.now() - this_date < datetime.timedelta(hours=cfg.DATE_FMT_BOT_SHORT_HOURS):
+        if now is None:
+            now = datetime.datetime.now()
+        if now - this_date < datetime.timedelta(hours=cfg.DATE_FMT_BOT_SHORT_HOURS):
             return this_date.strftime(cfg.DATE_FMT_BOT_SHORT)
         else:
             return this_date.strftime(cfg.DATE_FMT_BOT)
@@ -406,18 +616,18 @@ class LabBot:
         """Reads header line and last few lines from a file, returns the bytes"""
         firstlast = default
         try:
-            with open(fname, "rb") as fp:
-                line0 = fp.readline()
-                # get file length
-                fp.seek(0, 2)
-                size = fp.tell()
-                bytelength = maxLineLength * 22
-                bytelength = min(size, bytelength)
-                fp.seek(-bytelength, 2)  # 2 means "from the end of the file"
-                lines = fp.read(bytelength)
+            # the file is mapped into memory, so only the pages of the first and last lines are read
+            with open(fname, "rb") as fp, mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                size = len(mm)
+                pos_newline = mm.find(b"\n")
+                line0 = mm[:pos_newline + 1] if pos_newline >= 0 else mm[:]
+                bytelength = min(size, maxLineLength * 22)
+                lines = mm[size - bytelength:]
                 firstlast = line0 + lines
+        except ValueError:  # empty files cannot be mapped
+            pass
         except OSError:
-            logging.warning('Problem reading log file {}.'.format(fname))
+            logging.warning('Problem reading log file %s.', fname)
         return firstlast
 
     def add_to_last_commands(self, user, command):
@@ -438,7 +648,7 @@ class LabBot:
     def hello_handler(self, update, context, args=[], chat_id=0):
         context.bot.send_message(chat_id=update.effective_message.chat_id, text=self.pick_random(cfg.TEXTS_START),
                          parse_mode=telegram.ParseMode.MARKDOWN, reply_markup=self.reply_markup)
-        logging.info('Hello {}.'.format(update.effective_message.chat_id))
+        logging.info('Hello %s.', update.effective_message.chat_id)
 
     @restricted
     @send_action(ChatAction.TYPING)
@@ -455,7 +665,7 @@ class LabBot:
         str_out += '\n_The first value is the upper limit outside of quiet hours, second value is within quiet hours.'
         str_out += ' Quiet hours are from {} to {} on {}. These settings can be changed by your administrator._'.format(str_quiet_start, str_quiet_end, str_quiet_days)
         context.bot.send_message(chat_id=chat_id, text=str_out, parse_mode=telegram.ParseMode.MARKDOWN, reply_markup=self.reply_markup)
-        logging.info('List of warning limits sent to {}.'.format(chat_id))
+        logging.info('List of warning limits sent to %s.', chat_id)
 
     @restricted
     @send_action(ChatAction.TYPING)
@@ -471,7 +681,7 @@ class LabBot:
 
         if len(args) != 1 or args[0].lower() not in cfg.MEASURE_REQUESTS:
             str_out = "I don't know what to measure."
-            logging.info("Measure request ({}) by {} unsuccessful.".format(args, chat_id))
+            logging.info("Measure request (%s) by %s unsuccessful.", args, chat_id)
             context.bot.send_message(chat_id=chat_id, text=str_out, reply_markup=self.reply_markup)
             return False
 
@@ -479,7 +689,7 @@ class LabBot:
         m_dict = cfg.MEASURE_REQUESTS[entity]
         data = self.measure_getlast(entity)
         if data is not None and data.shape[0] > 0:
-            date_last_measured = data.tail(1).index.to_pydatetime()[0]
+            date_last_measured = data.index[-1].to_pydatetime()
         else:
             date_last_measured = now - datetime.timedelta(days=365)
 
@@ -497,7 +707,7 @@ class LabBot:
         self.MEASURE_requests[entity]['chat_ids'].add(chat_id)
 
         str_out = "Sent request to measure *{}*.".format(entity)
-        logging.info("Measure request ({}) by {}.".format(entity, chat_id))
+        logging.info("Measure request (%s) by %s.", entity, chat_id)
         context.bot.send_message(chat_id=chat_id, text=str_out, parse_mode=telegram.ParseMode.MARKDOWN)
 
     @restricted
@@ -518,17 +728,9 @@ class LabBot:
 
         df = pd.DataFrame()
         try:
-            df = pd.read_csv(io.BytesIO(selected_lines),
-                             sep=cfg.LOG_FILE_DELIMITER,
-                             comment=cfg.LOG_FILE_DELIMITER_COMMENT_SYMBOL,
-                             parse_dates=True,
-                             date_parser=self.str2date,
-                             skiprows=[1],  # 0 are the column headers, 1 is truncated
-                             index_col=0,
-                             dtype=float,
-                             on_bad_lines="skip")
+            df = read_log_lines(selected_lines)
         except pd.errors.EmptyDataError:
-            logging.warning('No data found in log file {}.'.format(log_file))
+            logging.warning('No data found in log file %s.', log_file)
             return None
         return df[-num:]
 
@@ -556,11 +758,12 @@ class LabBot:
                 if hours == 0:  # re-enable all warnings
                     self.ERRORS_checks[error][chat_id]['sendNext'] = now - \
                         datetime.timedelta(minutes=cfg.WARNING_SEND_EVERY_MINUTES)
-                    logging.info("Error {} enabled by {}.".format(error, chat_id))
+                    logging.info("Error %s enabled by %s.", error, chat_id)
                 else:
                     self.ERRORS_checks[error][chat_id]['sendNext'] = now + datetime.timedelta(hours=hours)
                     list_disabled.append(error)
-                    logging.info("Error {} disabled for {} hours by {}.".format(error, hours, chat_id))
+                    logging.info("Error %s disabled for %s hours by %s.", error, hours, chat_id)
+                self.save_config = True
 
         if hours == 0:
             str_out = 'All warning messages re-enabled.'
@@ -585,7 +788,7 @@ class LabBot:
             for chat_id in cfg.LIST_OF_USERS:
                 context.bot.send_chat_action(chat_id=chat_id, action=ChatAction.TYPING)
                 context.bot.send_message(chat_id=chat_id, text=str1 + str2, parse_mode=telegram.ParseMode.MARKDOWN)
-            logging.info('{} messaged all with: {}.'.format(chat_id_sender, str2))
+            logging.info('%s messaged all with: %s.', chat_id_sender, str2)
 
     def notification_to_string(self, notification):
         """returns string from notification dictionary"""
@@ -616,28 +819,25 @@ class LabBot:
 
     def notification_change(self, user, args, action="act"):
         """deletes, activates, deactivates notifications. Action is one of "act", "deact", "del". """
-        is_tochange = []
+        notifications = self.USER_config[user].get('notifications', [])
 
         if args[0] == 'all':
-            is_tochange = range(len(self.USER_config[user]['notifications']))
+            is_tochange = range(len(notifications))
         else:
-            try:
-                for a in args:
-                    is_tochange.append(int(a) - 1)
-            except ValueError:
-                pass
+            is_tochange = {int(a) - 1 for a in args if a.isdecimal()}  # isdigit would let "²" through, which int() rejects
+        is_tochange = [i for i in is_tochange if 0 <= i < len(notifications)]
+
         num_changed = 0
-        for i in reversed(sorted(is_tochange)):  # we need the reversed and sorted when action is delete
-            if i >= 0 and i < len(self.USER_config[user]['notifications']):
-                if action == "act":
-                    self.USER_config[user]['notifications'][i]['active'] = True
-                elif action == "deact":
-                    self.USER_config[user]['notifications'][i]['active'] = False
-                elif action == "del":
-                    del self.USER_config[user]['notifications'][i]
-                else:
-                    raise ValueError('Unknown action "{}" in function notification_change.'.format(action))
-                num_changed += 1
+        for i in sorted(is_tochange, reverse=True):  # we need the reversed order when action is delete
+            if action == "act":
+                notifications[i]['active'] = True
+            elif action == "deact":
+                notifications[i]['active'] = False
+            elif action == "del":
+                del notifications[i]
+            else:
+                raise ValueError('Unknown action "{}" in function notification_change.'.format(action))
+            num_changed += 1
         if num_changed > 0:
             self.save_config = True
         return num_changed
@@ -656,61 +856,55 @@ class LabBot:
                              '\ne.g. "/n temp < 8".\nAlso you can use "/n list" to list notifications'
                              ' and "/n del n" to delete a specific notification.\n\n{}'.format(
                                  self.notification_list(chat_id)), parse_mode=telegram.ParseMode.MARKDOWN)
-            logging.info('Notification-setup for {} failed due to wrong format ({}).'.format(chat_id, " ".join(args)))
+            logging.info('Notification-setup for %s failed due to wrong format (%s).', chat_id, " ".join(args))
             return False
 
         if args[0] in ['list', 'l']:  # list notifications
             str_out = self.notification_list(chat_id)
 
             context.bot.send_message(chat_id=chat_id, text=str_out, parse_mode=telegram.ParseMode.MARKDOWN)
-            logging.info('Notification list sent to {}.'.format(chat_id))
+            logging.info('Notification list sent to %s.', chat_id)
             return True
 
         # delete, activate, deactivate
-        action_dicts = {
-            "deact": {'keywords': ['deact', 'dea', 'inact', 'inactivate', 'deactivate'], 'str_name': 'deactivate', 'str_todo': 'to deactivate', 'str_done': 'deactivated'},
-            "act": {'keywords': ['act', 'a', 'activate'], 'str_name': 'activate', 'str_todo': 'to activate', 'str_done': 'activated'},
-            "del": {'keywords': ['del', 'delete', 'remove'], 'str_name': 'delete', 'str_todo': 'to delete', 'str_done': 'removed'},
-        }
-        for action_key, action_dict in action_dicts.items():
-            if args[0] in action_dict['keywords']:
-                if len(args) <= 1:
-                    context.bot.send_message(
-                        chat_id=chat_id, text='Please specify which notification to {}, e.g. "n {} 2"'.format(
-                            action_dict['str_todo'], action_dict['keywords'][0]
-                        ), parse_mode=telegram.ParseMode.MARKDOWN
-                    )
-                    logging.info(
-                        'Notification-{} for {} failed due to wrong format ({}).'.format(
-                            action_dict['str_name'], chat_id, " ".join(args)
-                        )
-                    )
-                    return False
-                num_changed = self.notification_change(chat_id, args[1:], action_key)
+        action_key = NOTIFICATION_ACTION_KEYWORDS.get(args[0])
+        if action_key:
+            action_dict = NOTIFICATION_ACTIONS[action_key]
+            if len(args) <= 1:
+                context.bot.send_message(
+                    chat_id=chat_id, text='Please specify which notification to {}, e.g. "n {} 2"'.format(
+                        action_dict['str_todo'], action_dict['keywords'][0]
+                    ), parse_mode=telegram.ParseMode.MARKDOWN
+                )
+                logging.info('Notification-%s for %s failed due to wrong format (%s).', action_dict['str_name'], chat_id, " ".join(args))
+                return False
+            num_changed = self.notification_change(chat_id, args[1:], action_key)
 
-                str_plural = ''
-                if num_changed != 1:
-                    str_plural = 's'
+            str_plural = ''
+            if num_changed != 1:
+                str_plural = 's'
 
-                context.bot.send_message(chat_id=chat_id, text='{:d} notification{} {}.\n\n{}'.format(
-                    num_changed, str_plural, action_dict['str_done'],
-                    self.notification_list(chat_id)), parse_mode=telegram.ParseMode.MARKDOWN
-                )
-                logging.info('Notifications {} for user {}: {:d}.'.format(
-                    action_dict['str_done'], chat_id, num_changed))
-                return True
+            context.bot.send_message(chat_id=chat_id, text='{:d} notification{} {}.\n\n{}'.format(
+                num_changed, str_plural, action_dict['str_done'],
+                self.notification_list(chat_id)), parse_mode=telegram.ParseMode.MARKDOWN
+            )
+            logging.info('Notifications %s for user %s: %d.', action_dict['str_done'], chat_id, num_changed)
+            return True
 
         if args[0] in ['add']:
             args = args[1:]
 
-        # remove all special characters and put extra whitespace around '<' and '>', also replace ',' for '.'
-        query_string = re.sub(r'[^\w\s<>+-.,]', '',
-                              ' '.join(args)).replace('>', ' > ').replace('<', ' < ').replace(',', '.')
-        query_items = query_string.split()
+        if len(args) == 3 and args[1] in NOTIFICATION_COMPARISONS and RE_NOTIFICATION_PLAIN.fullmatch(args[0]) \
+                and RE_NOTIFICATION_PLAIN.fullmatch(args[2]):  # already in the right format, e.g. "temp < 8"
+            query_items = [args[0].replace(',', '.'), args[1], args[2].replace(',', '.')]
+        else:
+            # remove all special characters and put extra whitespace around '<' and '>', also replace ',' for '.'
+            query_string = RE_NOTIFICATION_CLEAN.sub('', ' '.join(args)).translate(NOTIFICATION_TRANSLATION)
+            query_items = query_string.split()
         if len(query_items) != 3:
             context.bot.send_message(chat_id=chat_id, text='Notification should contain three elements,\ne.g. "/n temp < 8".',
                              parse_mode=telegram.ParseMode.MARKDOWN)
-            logging.info('Notification-setup for {} failed due to wrong format ({}).'.format(chat_id, " ".join(args)))
+            logging.info('Notification-setup for %s failed due to wrong format (%s).', chat_id, " ".join(args))
             return False
 
         column = self.get_column_name(query_items[0])
@@ -721,20 +915,16 @@ class LabBot:
                 text='I do not recognize the first element. It should be one of:\n{}'.format(str_out),
                 parse_mode=telegram.ParseMode.MARKDOWN
             )
-            logging.info('Notification-setup for {} failed due to wrong format ({}).'.format(chat_id, " ".join(args)))
+            logging.info('Notification-setup for %s failed due to wrong format (%s).', chat_id, " ".join(args))
             return False
 
-        comparison = 0
-        if query_items[1] in ['>', 'g', 'gt', 'gr']:
-            comparison = 1  # for >
-        elif query_items[1] in ['<', 's', 'lt', 'l', 'k', 'kl']:
-            comparison = -1
+        comparison = NOTIFICATION_COMPARISONS.get(query_items[1], 0)
         if comparison == 0:  # the query_item was neither "<" nor ">"
             context.bot.send_message(
                 chat_id=chat_id,
                 text='The second element of the notification should be either "<" or ">",\n e.g. "temp < 8".',
                 parse_mode=telegram.ParseMode.MARKDOWN)
-            logging.info('Notification-setup for {} failed due to wrong format ({}).'.format(chat_id, " ".join(args)))
+            logging.info('Notification-setup for %s failed due to wrong format (%s).', chat_id, " ".join(args))
             return False
 
         try:
@@ -744,7 +934,7 @@ class LabBot:
                 chat_id=chat_id,
                 text='The third element of the notification should be a number,\n e.g. "temp < 8".',
                 parse_mode=telegram.ParseMode.MARKDOWN)
-            logging.info('Notification-setup for {} failed due to wrong format ({}).'.format(chat_id, " ".join(args)))
+            logging.info('Notification-setup for %s failed due to wrong format (%s).', chat_id, " ".join(args))
             return False
 
         n = {'column': column, 'comparison': comparison, 'limit': limit}
@@ -756,7 +946,7 @@ class LabBot:
         self.save_config = True
         context.bot.send_message(chat_id=chat_id, text='Notification set up: {}\n\n{}'.format(
             str_out, self.notification_list(chat_id)), parse_mode=telegram.ParseMode.MARKDOWN)
-        logging.info('Notification set up for {}: {}.'.format(chat_id, str_out))
+        logging.info('Notification set up for %s: %s.', chat_id, str_out)
 
     @restricted
     @send_action(ChatAction.TYPING)
@@ -773,81 +963,91 @@ class LabBot:
             bot = self.bot
         bot.send_message(chat_id=chat_id, text=str1 + str2,
                          parse_mode=telegram.ParseMode.MARKDOWN, reply_markup=self.reply_markup)
-        logging.info('User notification sent to {}: {}.'.format(chat_id, str2))
+        logging.info('User notification sent to %s: %s.', chat_id, str2)
 
     @restricted
     @send_action(ChatAction.TYPING)
     def help_message(self, update, context, chat_id=0):
         """Prints a help message."""
         chat_id = self.get_chat_id(update, chat_id)
-        str_out = 'Ask me for *status updates* using: "status" or "/status" or "s".\n'
-        str_out += '"s 0.5" will display the slopes for the last 0.5 hours.\n\n'
-        str_out += 'Pressure, temperature and logging warnings will be sent every {:d} minutes. '.format(
-            cfg.WARNING_SEND_EVERY_MINUTES)
-        str_out += 'Use "limits" to see warning limits.\n\n'
-        str_out += '*Active warning messages* are shown using /w or "warnings".\n\n'
-        str_out += 'The active *warnings can be silenced* for n hours using the command "/silence n".\n'
-        str_out += 'n=0 will re-enable normal warnings.\n\n'
-        str_out += '*Graphs* can be plotted using the "graph" keyword or "/graph" and "/g" commands. '
-        str_out += 'Extra parameters are possible to specify _from_ and _to_ dates.\n'
-        str_out += 'Try: "/g -3d" or "g -12h -10h"\n'
-        str_out += 'Also: "/g 20" or "g 2.5d" will work as short notations.\n'
-        str_out += 'The graph and status commands both support extra arguments'
-        str_out += 'specifying the sensor data that should be plotted.\n'
-        str_out += '"g afm prep tafm" or "g all".\n\n'
-        str_out += 'You can even do some fits in the graph module: "g tafm fit -0.5 0.5 2" for fitting of the temperature data from 0.5 hours ago to 0.5 hours into the future with a 2nd order polynomial.\n'
-        str_out += 'A shortcut is "g tafm fit 0.5" for the same fit but with an order 1 polynomial as default.\n\n'
-        str_out += '*User notifications* can be set up using:\n'
-        str_out += '/n afm < 1e-10\n'
-        str_out += 'n afm lt 1e-10\n'
-        str_out += 'n list\n'
-        str_out += 'n t < 10\n'
-        str_out += 'n list\n'
-        str_out += 'n del 1  _(delete notification 1)_\n'
-        str_out += 'n deact all  _(deactivate all notifications)_\n'
-        str_out += 'n act 1 2 3   _(activate notifications 1,2, and 3)_\n\n'
-        str_out += '*Last commands* (status and graph) can be executed using:\n'
-        str_out += '"last" or "/l 2" or ". 3 4 5"\n'
-        str_out += 'List all last commands with "last list" or "l l"'
-
-        context.bot.send_message(chat_id=chat_id, text=str_out, parse_mode=telegram.ParseMode.MARKDOWN,
+        context.bot.send_message(chat_id=chat_id, text=HELP_MESSAGE, parse_mode=telegram.ParseMode.MARKDOWN,
                          reply_markup=self.reply_markup)
 
-    def _calculate_gradients(self, columns, gradient_dates):
+    def _calculate_gradients(self, columns, gradient_dates, now=None):
         gradients = {}
         from_date = gradient_dates[0]
         if len(gradient_dates) >= 2:
             to_date = gradient_dates[1]
         else:
-            to_date = datetime.datetime.now() + datetime.timedelta(hours=1)  # we want some extra time, just in case
-        data = self.read_logs(from_date=from_date, to_date=to_date)  # read the necessary log files
+            if now is None:
+                now = datetime.datetime.now()
+            to_date = now + datetime.timedelta(hours=1)  # we want some extra time, just in case
+        data = self.read_logs(from_date=from_date, to_date=to_date, columns=columns)  # read the necessary log files
         if data is None:
             return gradients
 
-        data = data[(data.index > from_date) & (data.index < to_date)]
+        data = self.filter_date_range(data, from_date, to_date)
         if not data.shape[0]:
             return gradients
 
-        x = pd.to_numeric(data.index) / 1e9  # convert to seconds
-        x_start = x[0]
-        x -= x_start
-        for c in columns:
-            if c not in data:
-                continue
-            xfit = x[:]
-            yfit = data[c]
-            if c in cfg.GRAPH_IGNORE_LOWERTHAN:
-                limit = cfg.GRAPH_IGNORE_LOWERTHAN[c]
-                idx = yfit > limit
-                xfit = xfit[idx]
-                yfit = yfit[idx]
-
-            if len(xfit):
-                fit = np.polyfit(xfit, yfit, 1)
-                gradients[c] = fit[0] * 60
+        columns = [c for c in columns if c in data]
+        if not len(columns):
+            return gradients
+
+        x = data.index.asi8.astype(np.float64)  # nanoseconds
+        x *= 1e-9  # convert to seconds
+        x -= x[0]
+        y = data[columns].to_numpy(dtype=np.float64)
+
+        # only use values above the limits (this also filters nan values)
+        limits = np.array([cfg.GRAPH_IGNORE_LOWERTHAN.get(c, -np.inf) for c in columns])
+        valid = y > limits
+        weights = valid.astype(np.float64)
+        y = np.where(valid, y, 0.)
+
+        # linear least squares fit for all columns at once
+        n = weights.sum(axis=0)
+        sx = x @ weights
+        sy = y.sum(axis=0)
+        sxx = (x * x) @ weights
+        sxy = x @ y
+        denominator = n * sxx - sx * sx
+        with np.errstate(divide='ignore', invalid='ignore'):
+            slopes = (n * sxy - sx * sy) / denominator
+
+        for c, n_c, d, slope in zip(columns, n, denominator, slopes):
+            if n_c > 1 and d > 0:
+                gradients[c] = slope * 60
 
         return gradients
 
+    def _calculate_fits(self, data, columns, from_date, to_date, order):
+        """polynomial fits of the data columns, evaluated between from_date and to_date.
+        Returns the dates and a dictionary of the fitted values (keys are the columns)."""
+        yfits = {}
+        columns = [c for c in dict.fromkeys(columns) if c in data and data[c].count()]
+        x = data.index.asi8
+        x_start = x[0]
+        x = x - x_start
+        xfit = pd.date_range(from_date, to_date, periods=100).asi8 - x_start
+        xplot = pd.to_datetime(xfit + x_start)
+        if not len(columns):
+            return xplot, yfits
+
+        # all columns without missing values are fitted at once
+        y = data[columns].to_numpy(dtype=np.float64)
+        valid = ~np.isnan(y)
+        complete = valid.all(axis=0)
+        if complete.any():
+            coeffs = np.polynomial.polynomial.polyfit(x, y[:, complete], order)
+            columns_complete = [c for c, is_complete in zip(columns, complete) if is_complete]
+            for c, yfit in zip(columns_complete, np.polynomial.polynomial.polyval(xfit, coeffs)):
+                yfits[c] = yfit
+        for j in np.flatnonzero(~complete):
+            coeffs = np.polynomial.polynomial.polyfit(x[valid[:, j]], y[valid[:, j], j], order)
+            yfits[columns[j]] = np.polynomial.polynomial.polyval(xfit, coeffs)
+        return xplot, yfits
+
     @restricted
     @send_action(ChatAction.TYPING)
     def status_sensors(self, update, context, args=[], chat_id=0, error_str="", add_to_last=True):
@@ -862,62 +1062,55 @@ class LabBot:
         if add_to_last:
             self.add_to_last_commands(chat_id, ["status", args])
 
+        now = datetime.datetime.now()
         str_out = error_str
         if self.LOG_last_checked:
-            str_out += "*{}*".format(self.date_format_bot(self.LOG_last_checked))
-        if self.quiet_hours():
+            str_out += "*{}*".format(self.date_format_bot(self.LOG_last_checked, now))
+        if self.quiet_hours(now):
             str_out += ' _(quiet hours)_'
         if 'ERROR_log_read' in self.ERRORS_checks:
             str_out += ' ' + cfg.WARNING_SYMBOL
 
         query_string = ' '.join(args)
-        query_string = re.sub(r'[^\w\s\.]', ' ', query_string.replace('-', ''))
+        query_string = RE_STATUS_CLEAN.sub(' ', query_string.replace('-', ''))
         query_items = query_string.split()
 
+        # get columns to display and the times for gradient calculation (numbers)
         columns = []
-        if 'all' in query_items:  # display data for all sensors
-            columns = self.LOG_labels
-            # add columns from measure requests as well
-            for entity, cm_dict in cfg.MEASURE_REQUESTS.items():
-                columns.append(cm_dict['column'])
-        else:
-            for q in query_items:
+        gradient_dates = []
+        gradients = {}
+        show_all = 'all' in query_items
+        for q in query_items:
+            if q[0] in TIME_TOKEN_PREFIX and RE_TIME_TOKEN.match(q):  # cheap check before using the regex
+                gradient_dates.append(self._get_datetime_from_string(q))
+            elif not show_all:
                 c = self.get_column_name(q)
                 if c:
                     columns.append(c)
+        if show_all:  # display data for all sensors
+            columns = self.LOG_labels + list(MEASURE_REQUESTS_COLUMNS)  # add columns from measure requests as well
         if not len(columns):
-            columns = cfg.STATUS_DEFAULT_COLUMNS.copy()
+            columns = list(cfg.STATUS_DEFAULT_COLUMNS)
 
-        # see if we have numbers - these are times for gradient calculation
-        gradient_dates = []
-        gradients = {}
-        for q in query_items:
-            if re.match(r'[-+]?[0-9].\.?[0-9]*[YymMdDwHhSs]$', q) or re.match(r'[-+]?[0-9]*\.?[0-9]*$', q):
-                gradient_dates.append(self._get_datetime_from_string(q))
-        if not len(gradient_dates):
-            if "g" in query_items or "grad" in query_items or "gradient" in query_items or 'fit' in query_items or 'f' in query_items or "slope" in query_items:
-                gradient_dates.append(datetime.datetime.now() - datetime.timedelta(hours=cfg.STATUS_SLOPE_DEFAULT_FROM_HOURS))
+        if not len(gradient_dates) and not GRADIENT_KEYWORDS.isdisjoint(query_items):
+            gradient_dates.append(now - datetime.timedelta(hours=cfg.STATUS_SLOPE_DEFAULT_FROM_HOURS))
 
-        if len(gradient_dates):
-            gradients = self._calculate_gradients(columns, gradient_dates)
+        # measure request columns are not in the log files, so we only need to read the logs for the other columns
+        if len(gradient_dates) and any(c in self.LOG_data for c in columns):
+            gradients = self._calculate_gradients(columns, gradient_dates, now)
 
         # check if there are any columns associated with errors
-        columns_error = []
-        error_lists = {}
-        error_lists.update(cfg.ERROR_COLUMNS_MUSTHAVE)
-        error_lists.update(cfg.ERROR_LIMITS_MAX)
-        error_lists.update(cfg.ERROR_LOWERTHAN_VALUES)
-        for error, error_dict in error_lists.items():
+        columns_error = set()
+        for error, c in ERROR_COLUMNS.items():
             if error in self.ERRORS_checks:
-                c = error_dict['column']
                 if c not in columns:
                     columns.append(c)
-                columns_error.append(c)
+                columns_error.add(c)
 
-        log_data_replaced = self.replace_lowerthan(self.LOG_data)
+        lines = [str_out]  # one line per column
         for c in columns:
             if c in self.LOG_data:
-                val = log_data_replaced[c]
+                val = self.replace_lowerthan_value(self.LOG_data[c])
                 str_error = ''
                 if c in columns_error:
                     str_error = " " + cfg.WARNING_SYMBOL
@@ -925,45 +1118,42 @@ class LabBot:
                 if c in gradients:
                     grad_str = "      _slope: {:.{prec}g} min⁻¹ _".format(gradients[c], prec=cfg.FLOAT_PRECISION_BOT_GRADIENT)
                 if isinstance(val, str):
-                    str_out += "\n*{}*: {}{}{}".format(self.LOG_labels_nice[c], val, grad_str, str_error)
+                    lines.append("*{}*: {}{}{}".format(self.LOG_labels_nice[c], val, grad_str, str_error))
                 else:
-                    str_out += "\n*{}*: {:.{prec}g}{}{}".format(self.LOG_labels_nice[c], val, grad_str, str_error, prec=cfg.FLOAT_PRECISION_BOT)
+                    lines.append("*{}*: {:.{prec}g}{}{}".format(self.LOG_labels_nice[c], val, grad_str, str_error, prec=cfg.FLOAT_PRECISION_BOT))
             else:
-                # check the message requests - here we need to read the log file
-                for entity, cm_dict in cfg.MEASURE_REQUESTS.items():
-                    if c == cm_dict['column']:
-                        data = self.measure_getlast(entity, 2)
-                        if data is not None and data.shape[0] > 0:
-                            date_last_measured = data.tail(1).index.to_pydatetime()[0]
-                            # if date_last_measured <= m_dict['last_measured']:
-                            #     continue  # no new values in the file yet
-                            column_name = cfg.MEASURE_REQUESTS[entity]['column']
-                            if column_name not in data:
-                                logging.info(
-                                    "Status for {}: Column {} not found in log file.".format(entity, column_name)
-                                )
-                                continue
-                            value = data.tail(1)[column_name]
-                            column_name_nice = cfg.LOG_NAMES_REPLACEMENT(column_name)
-                            str_out += "\n*{}*: {}  _({})_".format(
-                                column_name_nice,
-                                self.replace_lowerthan(value).values[0],
-                                self.date_format_bot(date_last_measured)
-                            )
-                            # change since last measured
-                            if len(gradient_dates) > 0 and len(data) > 1:
-                                value1 = data.iloc[-1][column_name]
-                                value2 = data.iloc[-2][column_name]
-                                if value1 >= 0 and value2 >=0:
-                                    value_diff = value2 - value1
-                                    hours_diff = (data.index[-1] - data.index[-2]).total_seconds() / 3600
-                                    if hours_diff > 0:
-                                        str_out += "      _slope: {:.{prec}g} h⁻¹ _".format(value_diff / hours_diff, prec=cfg.FLOAT_PRECISION_BOT_GRADIENT)
-
-
+                # check the measure requests - here we need to read the log file
+                entity = MEASURE_REQUESTS_COLUMNS.get(c)
+                if entity is None:
+                    continue
+                data = self.measure_getlast(entity, 2)
+                if data is None or data.shape[0] == 0:
+                    continue
+                date_last_measured = data.index[-1].to_pydatetime()
+                # if date_last_measured <= m_dict['last_measured']:
+                #     continue  # no new values in the file yet
+                if c not in data:
+                    logging.info("Status for %s: Column %s not found in log file.", entity, c)
+                    continue
+                values = data[c].to_numpy()
+                lines.append("*{}*: {}  _({})_".format(
+                    cfg.LOG_NAMES_REPLACEMENT(c),
+                    self.replace_lowerthan_value(values[-1]),
+                    self.date_format_bot(date_last_measured, now)
+                ))
+                # change since last measured
+                if len(gradient_dates) > 0 and len(values) > 1:
+                    if values[-1] >= 0 and values[-2] >= 0:
+                        value_diff = values[-2] - values[-1]
+                        timestamps = data.index.asi8  # nanoseconds
+                        hours_diff = (timestamps[-1] - timestamps[-2]) / 3.6e12
+                        if hours_diff > 0:
+                            lines[-1] += "      _slope: {:.{prec}g} h⁻¹ _".format(value_diff / hours_diff, prec=cfg.FLOAT_PRECISION_BOT_GRADIENT)
+
+        str_out = "\n".join(lines)
         self.bot.send_message(chat_id=chat_id, text=str_out, parse_mode=telegram.ParseMode.MARKDOWN,
                          reply_markup=self.reply_markup)
-        logging.info('Status sent to {}'.format(chat_id))
+        logging.info('Status sent to %s', chat_id)
 
     @restricted
     @send_action(ChatAction.TYPING)
@@ -971,7 +1161,7 @@ class LabBot:
         chat_id = self.get_chat_id(update, chat_id)
         context.bot.send_message(chat_id=chat_id, text='Sorry, Bakeout-Status is not implemented yet. ',
                          parse_mode=telegram.ParseMode.MARKDOWN, reply_markup=self.reply_markup)
-        logging.info('Bakeout-status (not implemented) sent to {}'.format(chat_id))
+        logging.info('Bakeout-status (not implemented) sent to %s', chat_id)
 
     @restricted
     @send_action(ChatAction.TYPING)
@@ -979,7 +1169,7 @@ class LabBot:
         chat_id = self.get_chat_id(update, chat_id)
         context.bot.send_message(chat_id=chat_id, text='Sorry, this is not implemented yet. ',
                          parse_mode=telegram.ParseMode.MARKDOWN, reply_markup=self.reply_markup)
-        logging.info('Photo (not implemented) sent to {}.'.format(chat_id))
+        logging.info('Photo (not implemented) sent to %s.', chat_id)
 
     @restricted
     @send_action(ChatAction.TYPING)
@@ -999,7 +1189,7 @@ class LabBot:
                     continue
             else:
                 str_out = ''
-            errors_sent = False
+            warnings = []  # all warnings for this user are sent in one message
             for error in self.ERRORS_checks.keys():
                 if chat_id not in self.ERRORS_checks[error]:
                     continue
@@ -1008,14 +1198,12 @@ class LabBot:
                         continue
                 if send_all:
                     str_out += '\n'
-                    pre = ''
                 else:
                     str_out = ''
-                    pre = cfg.WARNING_PRE
                 if 'value' in self.ERRORS_checks[error][chat_id]:
-                    str_out += pre + cfg.WARNING_MESSAGES[error].format(self.ERRORS_checks[error][chat_id]['value'])
+                    str_out += cfg.WARNING_MESSAGES[error].format(self.ERRORS_checks[error][chat_id]['value'])
                 else:
-                    str_out += pre + cfg.WARNING_MESSAGES[error]
+                    str_out += cfg.WARNING_MESSAGES[error]
                 if error == 'ERROR_log_read':
                     if self.LOG_last_checked:
                         str_out += self.LOG_last_checked.strftime(cfg.DATE_FMT_BOT) + '.'
@@ -1023,14 +1211,14 @@ class LabBot:
                         str_out += 'unknown.'
 
                 if not send_all:
-                    self.bot.send_chat_action(chat_id=chat_id, action=ChatAction.TYPING)
-                    self.bot.send_message(chat_id=chat_id, text=str_out, parse_mode=telegram.ParseMode.MARKDOWN)
+                    warnings.append(str_out)
                     self.ERRORS_checks[error][chat_id]['sendNext'] = now + \
                         datetime.timedelta(minutes=cfg.WARNING_SEND_EVERY_MINUTES)
                     self.ERRORS_checks[error][chat_id]['timesSent'] += 1
-                    logging.info('Warning message "{}" sent to {}.'.format(error, chat_id))
-                    errors_sent = True
-            if errors_sent:
+                    logging.info('Warning message "%s" sent to %s.', error, chat_id)
+            if warnings:
+                self.save_config = True
+                self.bot.send_message(chat_id=chat_id, text=cfg.WARNING_PRE + '\n\n'.join(warnings), parse_mode=telegram.ParseMode.MARKDOWN)
                 self.status_sensors(None, context, chat_id=chat_id, add_to_last=False)
             if send_all:
                 if str_out:
@@ -1038,28 +1226,27 @@ class LabBot:
                     self.bot.send_message(chat_id=chat_id_request, text=str_out, parse_mode=telegram.ParseMode.MARKDOWN, reply_markup=self.reply_markup)
                 else:
                     self.bot.send_message(chat_id=chat_id_request, text='No active warning messages.', parse_mode=telegram.ParseMode.MARKDOWN, reply_markup=self.reply_markup)
-                logging.info('List of warning messages sent to {}.'.format(chat_id_request))
+                logging.info('List of warning messages sent to %s.', chat_id_request)
 
     def status_error_off(self, errors_off=[], errors_off_only_quiet=[]):
         """resets errors and sends de-warning message."""
+        dewarnings = {}  # all de-warnings for a user are sent in one message, keys are the chat ids
         for error, error_off_only_quiet in zip(errors_off, errors_off_only_quiet):
             for chat_id in cfg.LIST_OF_USERS:
-                dewarning_sent = False
                 if chat_id not in self.ERRORS_checks[error]:
                     continue
                 if self.ERRORS_checks[error][chat_id]['timesSent'] > 0:
-                    str_out = cfg.WARNING_OFF_PRE + cfg.WARNING_OFF_MESSAGES[error]
+                    str_out = cfg.WARNING_OFF_MESSAGES[error]
                     if error_off_only_quiet:
                         str_out += cfg.WARNING_OFF_MESSAGE_ONLY_QUIET
-                    self.bot.send_chat_action(chat_id=chat_id, action=ChatAction.TYPING)
-                    self.bot.send_message(chat_id=chat_id, text=str_out, parse_mode=telegram.ParseMode.MARKDOWN)
-                    logging.info('De-warning message "{}" sent to {}.'.format(error, chat_id))
-
-                if dewarning_sent:
-                    self.status_sensors(None, None, chat_id=chat_id, add_to_last=False)
+                    dewarnings.setdefault(chat_id, []).append(str_out)
+                    logging.info('De-warning message "%s" sent to %s.', error, chat_id)
 
             self.error_remove(error)
 
+        for chat_id, strs_out in dewarnings.items():
+            self.bot.send_message(chat_id=chat_id, text=cfg.WARNING_OFF_PRE + '\n\n'.join(strs_out), parse_mode=telegram.ParseMode.MARKDOWN)
+
     @restricted
     @send_action(ChatAction.TYPING)
     def status_graph_no_data(self, update, context, args=[], chat_id=0, from_date=None, to_date=None):
@@ -1072,7 +1259,22 @@ class LabBot:
             d2 = to_date.strftime("%Y-%m-%d %H:%M:%S")
         context.bot.send_message(chat_id=chat_id, text='No data available between {} and {}.'.format(
             d1, d2), reply_markup=self.reply_markup)
-        logging.info('Graph cannot be sent to {}: No data available between {} and {}.'.format(chat_id, d1, d2))
+        logging.info('Graph cannot be sent to %s: No data available between %s and %s.', chat_id, d1, d2)
+
+    def get_figure(self, num_rows):
+        """returns a figure with num_rows subplots (sharing the x-axis). Figures are kept and reused for later graphs."""
+        if num_rows in self.graph_figures:
+            fig, axs = self.graph_figures[num_rows]
+            for ax in axs[:, 0]:
+                ax.cla()
+            # undo tight_layout of the last graph, so the layout is the same as for a new figure
+            fig.subplots_adjust(**{p: plt.rcParams['figure.subplot.' + p] for p in ('left', 'right', 'bottom', 'top', 'wspace', 'hspace')})
+        else:
+            if len(self.graph_figures) >= GRAPH_FIGURES_MAX:  # close the oldest figure, unusual row numbers should not pile up
+                plt.close(self.graph_figures.pop(next(iter(self.graph_figures)))[0])
+            fig, axs = plt.subplots(num_rows, 1, sharex=True, squeeze=False, figsize=(8, 0.5 + 2 * num_rows))
+            self.graph_figures[num_rows] = (fig, axs)
+        return fig, axs
 
     def _get_datetime_from_string(self, arg, future=False):
         try:
@@ -1080,9 +1282,9 @@ class LabBot:
         except ValueError:
             pass
         if future:
-            arg = re.sub(r"^([0-9]*\.?[0-9]+[YymMdDwHhSs])$", r"+\1", arg)  # "20h" means "+20h"
+            arg = RE_TIME_UNSIGNED.sub(r"+\1", arg)  # "20h" means "+20h"
         else:
-            arg = re.sub(r"^([0-9]*\.?[0-9]+[YymMdDwHhSs])$", r"-\1", arg)  # "20h" means "-20h"
+            arg = RE_TIME_UNSIGNED.sub(r"-\1", arg)  # "20h" means "-20h"
         
         d = None
         try:
@@ -1090,10 +1292,9 @@ class LabBot:
             # remove the timezon info (so we can compare with the logged entries)
             d = datemath.dm(arg, type='datetime').astimezone().replace(tzinfo=None)
         except datemath.helpers.DateMathException:
-            logging.error('Error when converting {} to datetime.'.format(arg))
+            logging.error('Error when converting %s to datetime.', arg)
         except Exception:
-            logging.error('Error when converting {} to datetime.'.format(arg))
-            logging.error(traceback.format_exc())
+            logging.error('Error when converting %s to datetime.', arg, exc_info=True)
         return d
 
     @restricted
@@ -1176,9 +1377,9 @@ class LabBot:
             try:
                 order_interp = int(args_interp[2])
             except ValueError:
-                logging.error('Error when converting {} to interpolation order.'.format(args_interp[2]))
+                logging.error('Error when converting %s to interpolation order.', args_interp[2])
             except Exception:
-                logging.error('Error when converting {} to interpolation order.'.format(args_interp[2]))
+                logging.error('Error when converting %s to interpolation order.', args_interp[2])
 
         # small extra sanity checks
         if from_date > to_date:
@@ -1188,16 +1389,18 @@ class LabBot:
         if order_interp < 1:
             order_interp = cfg.GRAPH_FIT_DEFAULT_ORDER
 
-        data = self.read_logs(from_date=from_date, to_date=to_date)  # read the necessary log files
+        data = self.read_logs(from_date=from_date, to_date=to_date, columns=columns_toplot)  # read the necessary log files
         if data is None:
             self.status_graph_no_data(update, context, args=args, chat_id=chat_id, from_date=from_date, to_date=to_date)
             return False
         # filter date range
-        # data = data[from_date:to_date]
-        # the slicing causes problems for nonmonotonous data,
-        # which can happen when DST ends or when the log files are non-monotonous
-        data = data[(data.index > from_date) & (data.index < to_date)]
-        data_interp = data[(data.index > from_date_interp) & (data.index < to_date_interp)]
+        data = self.filter_date_range(data, from_date, to_date)
+        # filter non-positive values (errors are encoded as negative values)
+        columns = [c for c in dict.fromkeys(columns_toplot) if c in data]
+        limits = np.array([cfg.GRAPH_IGNORE_LOWERTHAN.get(c, -np.inf) for c in columns])
+        data = data.copy()
+        data[columns] = data[columns].mask(data[columns].to_numpy() <= limits)
+        data_interp = self.filter_date_range(data, from_date_interp, to_date_interp)
 
         if not (from_date_interp < now < to_date_interp and data_interp.shape[0] > 1):
             do_interp = False
@@ -1206,68 +1409,58 @@ class LabBot:
             self.status_graph_no_data(update, context, args=args, chat_id=chat_id, from_date=from_date, to_date=to_date)
             return False
 
-        fig, axs = plt.subplots(
-            len(columns_toplot), 1, sharex=True,
-            squeeze=False, figsize=(8, 0.5 + 2 * len(columns_toplot))
-        )
+        with self.graph_lock, plt.rc_context(GRAPH_RC_PARAMS):  # figures are shared between graph requests
+            fig, axs = self.get_figure(len(columns_toplot))
 
-        # get colors for columns
-        colors = {}
-        for i, c in enumerate(self.LOG_labels):
-            color = plt.cm.tab20(np.linspace(0, 1, len(self.LOG_labels)))[i % len(self.LOG_labels)]
-            colors[c] = matplotlib.colors.rgb2hex(color[0:3])
-        # colors = ['#1b9e77', '#e41a1c', '#d95f02', '#386cb0', '#285ca0']
-        total_count = 0
-        for i, c in enumerate(columns_toplot):
-            # filter non-positive values
-            if c in self.LOG_data:
-                axs[i, 0].set_ylabel(self.LOG_labels_nice[c])
-            axs[i, 0].tick_params(direction='in')
-            if c not in data:
-                continue
-            if c in cfg.GRAPH_IGNORE_LOWERTHAN:
-                limit = cfg.GRAPH_IGNORE_LOWERTHAN[c]
-                data[c][data[c] <= limit] = np.nan
-                data_interp[c][data_interp[c] <= limit] = np.nan
-            logy = False
-            if c in cfg.GRAPH_LOG_COLUMNS:
-                logy = True
-            count = data[c].count()
-            total_count += count
-            if count:
-                data.plot(y=c, ax=axs[i, 0], color=colors[c], ls='-', lw=2, ms=0, legend=None, logy=logy)
-                axs[i, 0].grid(which="major", alpha=0.3)
-                axs[i, 0].grid(which="minor", alpha=0.1)
-
-            # interpolation
-            if do_interp and data_interp[c].count():
-                x = pd.to_numeric(data_interp.index)
-                y = data_interp[c]
-                x_start = x[0]
-                x -= x_start
-
-                yfit_func = np.poly1d(np.polyfit(x, y, order_interp))
-                xfit = pd.to_numeric(pd.date_range(from_date_interp, to_date_interp, periods=100)) - x_start
-                yfit = yfit_func(xfit)
-                xplot = pd.to_datetime(xfit + x_start)
-
-                if logy:  # can plot any values <= 0
-                    yfit[yfit <= 0] = np.nan
-                axs[i,0].plot(xplot, yfit, color=colors[c], ls='--', lw=1, ms=0, alpha=0.5, label=None)
-
-        if not total_count:
-            self.status_graph_no_data(update, context, args=args, chat_id=chat_id, from_date=from_date, to_date=to_date)
-            return False
+            colors = self.get_colors()
+            # colors = ['#1b9e77', '#e41a1c', '#d95f02', '#386cb0', '#285ca0']
 
-        axs[-1, 0].set_xlabel('')
-        fig.autofmt_xdate()
-        plt.tight_layout(pad=1.02, w_pad=0, h_pad=0)
-        # fig.subplots_adjust(wspace=0, hspace=0)
-        plt.savefig(bio, format='png', dpi=100)
+            if do_interp:
+                xplot, yfits = self._calculate_fits(data_interp, columns_toplot, from_date_interp, to_date_interp, order_interp)
+            else:
+                xplot, yfits = None, {}
+
+            total_count = 0
+            for i, c in enumerate(columns_toplot):
+                if c in self.LOG_data:
+                    axs[i, 0].set_ylabel(self.LOG_labels_nice[c])
+                if c not in data:
+                    continue
+                logy = c in cfg.GRAPH_LOG_COLUMNS
+                count = data[c].count()
+                total_count += count
+                if count:
+                    # plain matplotlib instead of DataFrame.plot: pandas keeps time series state (freq, plotted data) on the axes,
+                    # which cla() does not reset and which would leak into later graphs on the reused figure
+                    axs[i, 0].plot(data.index, data[c], color=colors[c], ls='-', lw=2, ms=0)
+                    if logy:  # only log axes have minor ticks
+                        axs[i, 0].set_yscale('log')
+                        axs[i, 0].grid(which="minor", alpha=0.1)
+
+                # interpolation
+                if c in yfits:
+                    yfit = yfits[c].copy()
+                    if logy:  # can plot any values <= 0
+                        yfit[yfit <= 0] = np.nan
+                    axs[i,0].plot(xplot, yfit, color=colors[c], ls='--', lw=1, ms=0, alpha=0.5, label=None)
+
+            if not total_count:
+                self.status_graph_no_data(update, context, args=args, chat_id=chat_id, from_date=from_date, to_date=to_date)
+                return False
+
+            # the x-axis is shared, so the ticks of the last subplot apply to all of them
+            locator = matplotlib.dates.AutoDateLocator()
+            axs[-1, 0].xaxis.set_major_locator(locator)
+            axs[-1, 0].xaxis.set_major_formatter(GraphDateFormatter(locator))
+            axs[-1, 0].xaxis.set_minor_locator(matplotlib.ticker.AutoMinorLocator())
+            axs[-1, 0].set_xlabel('')
+            fig.autofmt_xdate()
+            fig.tight_layout(pad=1.02, w_pad=0, h_pad=0)
+            # fig.subplots_adjust(wspace=0, hspace=0)
+            fig.savefig(bio, format='png', dpi=100, pil_kwargs={'compress_level': 1})  # fast encoding, the size barely changes for plots
         bio.seek(0)
         context.bot.send_photo(chat_id=chat_id, photo=bio, reply_markup=self.reply_markup)
-        plt.close()
-        logging.info('Graph sent to {}.'.format(chat_id))
+        logging.info('Graph sent to %s.', chat_id)
 
     @restricted
     @send_action(ChatAction.TYPING)
@@ -1289,7 +1482,7 @@ class LabBot:
             str_out = "*Last commands:*\n" + str_out
             context.bot.send_message(chat_id=update.effective_message.chat_id, text=str_out,
                 parse_mode=telegram.ParseMode.MARKDOWN, reply_markup=self.reply_markup)
-            logging.info('List of last commands sent to {}.'.format(chat_id))
+            logging.info('List of last commands sent to %s.', chat_id)
             return
 
         ns = []
@@ -1302,7 +1495,7 @@ class LabBot:
             ns.append(1)
 
         num_sent = 0
-        logging.info('Sending last {} commands to {}.'.format(ns, chat_id))
+        logging.info('Sending last %s commands to %s.', ns, chat_id)
         for n in ns:
             res = self.get_from_last_commands(chat_id, n)
             if res is not None:
@@ -1319,9 +1512,20 @@ class LabBot:
             context.bot.send_message(chat_id=update.effective_message.chat_id, text="Last commands not found.",
                 parse_mode=telegram.ParseMode.MARKDOWN, reply_markup=self.reply_markup)
 
-    def read_logs(self, from_date, to_date):
-        """reads logs for the days between from_date and to_date.
-        If the number of columns is too big, it will be reduced using rolling averaging."""
+    def filter_date_range(self, data, from_date, to_date):
+        """returns the rows of data with an index between from_date and to_date (exclusive)"""
+        # data[from_date:to_date] causes problems for nonmonotonous data,
+        # which can happen when DST ends or when the log files are non-monotonous
+        if data.index.is_monotonic_increasing:
+            i_from = data.index.searchsorted(from_date, side='right')
+            i_to = data.index.searchsorted(to_date, side='left')
+            return data.iloc[i_from:i_to]
+        else:
+            return data[(data.index > from_date) & (data.index < to_date)]
+
+    def read_logs(self, from_date, to_date, columns=None):
+        """reads logs for the days between from_date and to_date. Only the given columns are returned (all if None).
+        If the number of rows is too big, it will be reduced by averaging blocks of consecutive rows."""
 
         if from_date > to_date:
             from_date, to_date = to_date, from_date
@@ -1341,15 +1545,10 @@ class LabBot:
         while this_date <= to_date_adjusted:
             log_file = this_date.strftime(cfg.LOG_FILE)
             try:
-                # we can use skiprows here, but I found that it doesn't really speed up things; so we do the rolling mean in the next line
-                df = pd.read_csv(log_file,
-                                 sep=cfg.LOG_FILE_DELIMITER,
-                                 comment=cfg.LOG_FILE_DELIMITER_COMMENT_SYMBOL,
-                                 parse_dates=True,
-                                 date_parser=self.str2date,
-                                 index_col=0,
-                                 dtype=float,
-                                 on_bad_lines="skip")  # TODO: check if ignoring bad lines does not cause any other errors
+                stat = os.stat(log_file)
+                df = read_log_file(log_file, stat.st_mtime_ns, stat.st_size)
+                if columns is not None:
+                    df = df[[c for c in dict.fromkeys(columns) if c in df]]
                 datas.append(df)
             except FileNotFoundError:
                 pass
@@ -1358,47 +1557,63 @@ class LabBot:
         if len(datas) > 0:
             data = pd.concat(datas, sort=False)
             if data.shape[0] > cfg.GRAPH_MAX_POINTS:
-                n = int(np.ceil(cfg.GRAPH_MAX_POINTS / data.shape[0]))
-                return data.rolling(n).mean().iloc[::n, :]
+                n = int(np.ceil(data.shape[0] / cfg.GRAPH_MAX_POINTS))
+                # error codes (see GRAPH_IGNORE_LOWERTHAN) are left out, they would distort the averages
+                limits = np.array([cfg.GRAPH_IGNORE_LOWERTHAN.get(c, -np.inf) for c in data.columns])
+                return pd.DataFrame(block_mean(data.to_numpy(), n, limits), index=data.index[::n], columns=data.columns)
             else:
                 return data
         else:
             return None
 
     def read_log(self, maxLineLength=120):
-        """parses log file on the server"""
+        """parses log file on the server and runs all checks, repeated every READ_LOG_EVERY_SECONDS"""
 
         # set timer for next function call (in case there are any excetions below)
-        self.timer_readlog = threading.Timer(cfg.READ_LOG_EVERY_SECONDS, self.read_log).start()
+        self.timer_readlog = threading.Timer(cfg.READ_LOG_EVERY_SECONDS, self.read_log)
+        self.timer_readlog.start()
 
-        self.log_file = (datetime.datetime.now() - datetime.timedelta(seconds=10)).strftime(cfg.LOG_FILE)
-
-        selected_lines = self.get_first_last_from_file(self.log_file, maxLineLength=maxLineLength, default=b"")
-        df = None
+        # skip this check if the previous one is still running, otherwise slow checks pile up in timer threads
+        if not self.read_log_lock.acquire(blocking=False):
+            logging.warning('Previous log check is still running, skipping this one.')
+            return
         try:
-            df = pd.read_csv(io.BytesIO(selected_lines),
-                             sep=cfg.LOG_FILE_DELIMITER,
-                             comment=cfg.LOG_FILE_DELIMITER_COMMENT_SYMBOL,
-                             parse_dates=True,
-                             date_parser=self.str2date,
-                             skiprows=[1],  # 0 are the column headers, 1 is truncated
-                             index_col=0,
-                             dtype=float,
-                             on_bad_lines="skip")
-            log_labels = df.columns.tolist()
-            log_labels_nice = list(map(cfg.LOG_NAMES_REPLACEMENT, log_labels))
-        except pd.errors.EmptyDataError:
-            logging.warning('No data found in log file {}.'.format(self.log_file))
+            self.read_log_checks(maxLineLength=maxLineLength)
         finally:
-            if isinstance(df, pd.DataFrame) and df.shape[0] > 0:
-                self.LOG_labels = log_labels
-                self.LOG_labels_nice = {l: l_nice for (l, l_nice) in zip(log_labels, log_labels_nice)}
-                self.LOG_last_checked = df.tail(1).index.to_pydatetime()[0]
+            self.read_log_lock.release()
 
-                # make a dictionary out of the dataframe
-                self.LOG_data = df.tail(1).to_dict(orient='records')[0]
-            else:
-                logging.warning('Problem extracting fields and field labels from log file {}.'.format(self.log_file))
+    def read_log_checks(self, maxLineLength=120):
+        """parses the last lines of the log file and checks for warnings, notifications and measure requests"""
+        self.log_file = (datetime.datetime.now() - datetime.timedelta(seconds=10)).strftime(cfg.LOG_FILE)
+
+        # the log file is only parsed if it changed since the last successful check
+        try:
+            stat = os.stat(self.log_file)
+            log_file_state = (self.log_file, stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            log_file_state = None
+        if log_file_state is None or log_file_state != self.log_file_state:
+            selected_lines = self.get_first_last_from_file(self.log_file, maxLineLength=maxLineLength, default=b"")
+            df = None
+            try:
+                df = read_log_lines(selected_lines)
+                log_labels = df.columns.tolist()
+            except pd.errors.EmptyDataError:
+                logging.warning('No data found in log file %s.', self.log_file)
+            finally:
+                if isinstance(df, pd.DataFrame) and df.shape[0] > 0:
+                    if log_labels != self.LOG_labels:  # the labels only change with the log file format
+                        self.LOG_colors = {}
+                        self.LOG_labels_nice = {l: cfg.LOG_NAMES_REPLACEMENT(l) for l in log_labels}
+                    self.LOG_labels = log_labels
+                    self.LOG_last_checked = df.tail(1).index.to_pydatetime()[0]
+
+                    # keep the last line as an array for vectorized checks and as a dictionary for lookups
+                    self.LOG_values = df.iloc[-1].to_numpy(dtype=np.float64)
+                    self.LOG_data = dict(zip(log_labels, self.LOG_values.tolist()))
+                    self.log_file_state = log_file_state
+                else:
+                    logging.warning('Problem extracting fields and field labels from log file %s.', self.log_file)
 
         self.check_sanity()
         self.check_user_notifications()
@@ -1413,10 +1628,11 @@ class LabBot:
         for user in cfg.LIST_OF_USERS:
             if user not in self.ERRORS_checks[error].keys():
                 self.ERRORS_checks[error][user] = {
-                    'sendNext': now + (min_count - 1) * datetime.timedelta(minutes=cfg.READ_LOG_EVERY_SECONDS),
+                    'sendNext': now + (min_count - 1) * datetime.timedelta(seconds=cfg.READ_LOG_EVERY_SECONDS),
                     'timesSent': 0,
                     'value': value,
                 }
+                self.save_config = True
 
         write_log = False
         if error not in self.LOGGING_last_write.keys():
@@ -1425,37 +1641,35 @@ class LabBot:
             write_log = True
 
         if write_log:
-            logging.info('Sanity checks found: {} - {}.'.format(error, value))
+            logging.info('Sanity checks found: %s - %s.', error, value)
             self.LOGGING_last_write[error] = now
 
     def error_remove(self, error):
         """removes an error from the error list for all users"""
-        self.ERRORS_checks.pop(error, None)
+        if self.ERRORS_checks.pop(error, None) is not None:
+            self.save_config = True
 
-    def quiet_hours(self):
+    def quiet_hours(self, now=None):
         """returns whether we are in quiet hours (as defined in the config section)"""
-        now = datetime.datetime.now()
-        quiet_start = now.replace(hour=0, minute=0, second=0, microsecond=0) + \
-            datetime.timedelta(hours=cfg.QUIET_TIMES_HOURS_START)
-        quiet_end = now.replace(hour=0, minute=0, second=0, microsecond=0) + \
-            datetime.timedelta(hours=cfg.QUIET_TIMES_HOURS_END)
-        if now > quiet_start and now < quiet_end and now.weekday() in cfg.QUIET_TIMES_WEEKDAYS:
-            return True
-        else:
-            return False
+        if now is None:
+            now = datetime.datetime.now()
+        seconds = now.hour * 3600 + now.minute * 60 + now.second + now.microsecond * 1e-6  # since midnight
+        return cfg.QUIET_TIMES and QUIET_TIMES_SECONDS_START < seconds < QUIET_TIMES_SECONDS_END and now.weekday() in cfg.QUIET_TIMES_WEEKDAYS
 
     def check_sanity(self):
         """checks whether the logging works and if the pressures are ok."""
 
-        error_checks_old = copy.deepcopy(self.ERRORS_checks)
         now = datetime.datetime.now()
 
         # index for limits defined in config, higher limits are defined for quiet hours
         i_quiet = 0
-        quiet_hours = self.quiet_hours()
+        quiet_hours = self.quiet_hours(now)
         if quiet_hours:
             i_quiet = 1
 
+        # columns with nan values
+        columns_nan = [c for c, is_nan in zip(self.LOG_labels, np.isnan(self.LOG_values)) if is_nan]
+
         # check for warnings that are not active anymore
         errors_off = []
         errors_off_only_quiet = []   # boolean values, same length as errors_off
@@ -1502,7 +1716,7 @@ class LabBot:
                     errors_off.append(error)
                     errors_off_only_quiet.append(False)
             elif error == cfg.ERROR_UNKNOWN_VALUES:
-                if not any(np.isnan(val) for val in self.LOG_data.values()):
+                if not columns_nan:
                     errors_off.append(error)
                     errors_off_only_quiet.append(False)
             else:
@@ -1523,25 +1737,21 @@ class LabBot:
                 self.error_add(error)
 
         if len(self.LOG_data) > 0:  # otherwise we will get an error for not being able to read the log file
-            for error, e_dict in cfg.ERROR_LIMITS_MAX.items():
-                if e_dict['column'] in self.LOG_data:
-                    if self.LOG_data[e_dict['column']] > e_dict['limits'][i_quiet]:
-                        min_count = 0
-                        if 'min_count' in e_dict:
-                            min_count = e_dict['min_count']
-                        self.error_add(error, self.LOG_data[e_dict['column']], min_count=min_count)
+            values = np.array([self.LOG_data.get(c, np.nan) for c in ERROR_LIMITS_MAX_COLUMNS])
+            for i in np.flatnonzero(values > ERROR_LIMITS_MAX_LIMITS[:, i_quiet]):  # missing columns are nan and never exceed limits
+                error = ERROR_LIMITS_MAX_ERRORS[i]
+                min_count = cfg.ERROR_LIMITS_MAX[error].get('min_count', 0)
+                self.error_add(error, self.LOG_data[ERROR_LIMITS_MAX_COLUMNS[i]], min_count=min_count)
 
             negative_error_default = False
             negative_error_columns = []
             for c in cfg.ERROR_LOWERTHAN:
                 if c in self.LOG_data:
                     if (self.LOG_data[c] <= 0):
-                        found_error_code = False
-                        for error, e_dict in cfg.ERROR_LOWERTHAN_VALUES.items():
-                            if e_dict['column'] == c and e_dict['value'] == self.LOG_data[c]:
-                                self.error_add(error, self.LOG_data[c])
-                                found_error_code = True
-                        if not found_error_code:
+                        error = ERROR_LOWERTHAN_VALUES_INDEX.get((c, self.LOG_data[c]))
+                        if error:
+                            self.error_add(error, self.LOG_data[c])
+                        else:
                             negative_error_columns.append(c)
                             negative_error_default = True
             if negative_error_default:
@@ -1549,8 +1759,8 @@ class LabBot:
                 str_columns = ", ".join(columns_nice)
                 self.error_add(cfg.ERROR_LOWERTHAN_DEFAULT, str_columns)
 
-            if any(np.isnan(val) for val in self.LOG_data.values()):
-                columns_nice = [self.LOG_labels_nice[c] for c in self.LOG_data if np.isnan(self.LOG_data[c])]
+            if columns_nan:
+                columns_nice = [self.LOG_labels_nice[c] for c in columns_nan]
                 str_columns = ", ".join(columns_nice)
                 self.error_add(cfg.ERROR_UNKNOWN_VALUES, str_columns)
 
@@ -1558,33 +1768,31 @@ class LabBot:
         self.status_error_off(errors_off, errors_off_only_quiet)
         self.status_error()
 
-        # save config if there were any changes
-        if self.save_config or self.ERRORS_checks != error_checks_old:
-            self.config_save()
+        # save config if there were any changes, but not more often than every CONFIG_SAVE_EVERY_SECONDS
+        if self.save_config:
+            if not self.config_last_saved or now - self.config_last_saved >= datetime.timedelta(seconds=CONFIG_SAVE_EVERY_SECONDS):
+                self.config_save()
 
     def check_user_notifications(self):
         """checks for notification alarms that have been set up by the user"""
         if not len(self.LOG_data) > 0:
             return False
+        # collect the active notifications of all users and compare them to the log values at once
+        to_check = []  # tuples of user and notification
         for user in cfg.LIST_OF_USERS:
-            if 'notifications' not in self.USER_config[user].keys():
-                continue
-            n_inactivate = []
-            for i, n in enumerate(self.USER_config[user]['notifications']):
-                if 'active' in n.keys():
-                    if not n['active']:
-                        continue
-                sign = n['comparison']
-                if n['column'] in self.LOG_data:
-                    if type(self.LOG_data[n['column']]) in [int, float]:
-                        if sign * self.LOG_data[n['column']] > sign * n['limit']:
-                            self.status_user_notification(None, None, chat_id=user, notification=n)
-                            n_inactivate.append(i)
-            # inactivate notification
-            for i in n_inactivate:  # if we want to delete them, we need to use reversed(n_inactivate)
-                self.USER_config[user]['notifications'][i]['active'] = False
-            if len(n_inactivate) > 0:
-                self.save_config = True
+            for n in self.USER_config[user].get('notifications', []):
+                if n.get('active', True) and n['column'] in self.LOG_data:
+                    to_check.append((user, n))
+        if not to_check:
+            return False
+        signs = np.array([n['comparison'] for _, n in to_check], dtype=np.float64)
+        limits = np.array([n['limit'] for _, n in to_check], dtype=np.float64)
+        values = np.array([self.LOG_data[n['column']] for _, n in to_check], dtype=np.float64)
+        for i in np.flatnonzero(signs * values > signs * limits):  # nan values never trigger
+            user, n = to_check[i]
+            self.status_user_notification(None, None, chat_id=user, notification=n)
+            n['active'] = False  # inactivate notification
+            self.save_config = True
 
     def check_measure_requests(self):
         """checks if measure requests have received responses"""
@@ -1594,11 +1802,11 @@ class LabBot:
                 continue
             data = self.measure_getlast(entity)
             if data is not None and data.shape[0] > 0:
-                date_measured = data.tail(1).index.to_pydatetime()[0]
+                date_measured = data.index[-1].to_pydatetime()
                 if date_measured > m_dict['last_measured']:
                     column_name = cfg.MEASURE_REQUESTS[entity]['column']
                     if column_name in data:
-                        value = data.tail(1)[column_name]
+                        value = self.replace_lowerthan_value(data[column_name].to_numpy()[-1])
                         column_name_nice = cfg.LOG_NAMES_REPLACEMENT(column_name)
                         chat_ids = self.MEASURE_requests[entity]['chat_ids']
                         self.MEASURE_requests[entity]['chat_ids'] = set()
@@ -1607,25 +1815,20 @@ class LabBot:
                         self.MEASURE_requests[entity]['value'] = value
                         str_out = "*{}*: {}  _({})_".format(
                             column_name_nice,
-                            self.replace_lowerthan(value).values[0],
-                            self.date_format_bot(date_measured)
+                            value,
+                            self.date_format_bot(date_measured, now)
                         )
                         for chat_id in chat_ids:
-                            logging.info("Measure request ({}) by {} successful: {}".format(
-                                entity, chat_id,
-                                self.replace_lowerthan(value).values[0])
-                            )
+                            logging.info("Measure request (%s) by %s successful: %s", entity, chat_id, value)
                             self.measure_send_result(self.bot, None, args=[str_out], chat_id=chat_id)
                         continue
                     else:
-                        logging.info(
-                            "Measure request for {}: Column {} not found in log file.".format(entity, column_name)
-                        )
+                        logging.info("Measure request for %s: Column %s not found in log file.", entity, column_name)
             if now - m_dict['requested'] > datetime.timedelta(minutes=cfg.MEASURE_REQUESTS[entity]['timeout']):
                 self.MEASURE_requests[entity]['active'] = False
                 str_out = "Request to measure *{}* timed out.".format(entity)
                 for chat_id in m_dict['chat_ids']:
-                    logging.info("Measure request ({}) by {} timed out.".format(entity, chat_id))
+                    logging.info("Measure request (%s) by %s timed out.", entity, chat_id)
                     self.measure_send_result(self.bot, None, args=[str_out], chat_id=chat_id)
 
     def check_logging_file(self, force=False):
@@ -1647,12 +1850,28 @@ class LabBot:
 
     def config_save(self):
         """saves config"""
+        self.save_config = False  # reset before serializing, so that changes made meanwhile by other threads are saved next time
         c = {n: getattr(self, n) for n in self.config_vars}
-        pickle.dump(c, open(cfg.USER_CONFIG_FILE, "wb"))
+        data = pickle.dumps(c, protocol=pickle.HIGHEST_PROTOCOL)
+        if data != self.config_saved_data:  # changes can cancel each other out, e.g. an error that is removed again
+            # write to a temporary file first, so that a crash cannot leave a truncated config behind
+            fname_tmp = cfg.USER_CONFIG_FILE + ".tmp"
+            with open(fname_tmp, "wb") as f:
+                f.write(data)
+            os.replace(fname_tmp, cfg.USER_CONFIG_FILE)
+            self.config_saved_data = data
+        self.config_last_saved = datetime.datetime.now()
+
+    def config_flush(self):
+        """saves config if there are pending changes"""
+        if self.save_config:
+            self.config_save()
 
     def config_load(self):
-        """saves config"""
-        c = pickle.load(open(cfg.USER_CONFIG_FILE, "rb"))
+        """loads config"""
+        with open(cfg.USER_CONFIG_FILE, "rb") as f:
+            self.config_saved_data = f.read()
+        c = pickle.loads(self.config_saved_data)
         for key, val in c.items():
             setattr(self, key, val)
 
@@ -1668,7 +1887,9 @@ class LabBot:
     def stop_bot(self):
         """stops the telegram bot"""
         threading.Thread(target=self.shutdown).start()
-        self.timer_readlog.stop()
+        if self.timer_readlog:
+            self.timer_readlog.cancel()
+        self.config_flush()  # write pending changes
         logging.info('AFM bot stopped')
 
 
@@ -1677,3 +1898,5 @@ if __name__ == "__main__":
     b.start_bot()
     print('Bot started.')
     print('Version: {}'.format(b.get_version()))
+    b.updater.idle()  # blocks until SIGINT, SIGTERM or SIGABRT, then stops the updater
+    b.stop_bot()  # cancels the log timer and writes pending config changes
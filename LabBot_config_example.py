@@ -1,5 +1,7 @@
-# Numerical user ids of people who can interact with the bot
-LIST_OF_USERS = ['007', '008']
+import re
+
+# Numerical user ids of people who can interact with the bot (a set, it is checked for every message)
+LIST_OF_USERS = frozenset([7, 8])  # integers, as the chat ids sent by Telegram
 
 # Telegram bot informaiton, talk to the Botfather to get this.
 BOT_ID = "<id>"
@@ -43,11 +45,15 @@ MESSAGE_COMMANDS_STRICT_MAXLENGTH = 3
 NUM_SAVE_LAST_COMMANDS = 10  # save a history of n commands (only graoh and status commands are saved)
 
 # replace names from the file using these callable
+NAMES_REPLACE = {
+    'TAFM': 'T_AFM', 'TCRY': 'T_Cryo', 'TSAM': 'T_Sample', 'TMAN': 'T_Manipulator', 'TLAB': 'T_Lab',
+    'LHE': 'LHe', 'PAFM': 'p_AFM', 'PPRP': 'p_Prep', 'PROU': 'p_Rough', '[': ' [',
+}
+RE_NAMES_REPLACE = re.compile('|'.join(map(re.escape, sorted(NAMES_REPLACE, key=len, reverse=True))))
+
+
 def replace(x):
-    x = x.replace('TAFM', 'T_AFM').replace('TCRY', 'T_Cryo').replace('TSAM', 'T_Sample').replace('TMAN', 'T_Manipulator')
-    x = x.replace('TLAB', 'T_Lab').replace('LHE', 'LHe').replace('PAFM', 'p_AFM').replace('PPRP', 'p_Prep').replace('PROU', 'p_Rough')
-    x = x.replace('[', ' [')
-    return x
+    return RE_NAMES_REPLACE.sub(lambda m: NAMES_REPLACE[m.group(0)], x)
 
 
 LOG_NAMES_REPLACEMENT = replace
@@ -55,8 +61,8 @@ LOG_NAMES_REPLACEMENT = replace
 # indices that are used to understand notification queries
 COLUMNS_LABELS = {
     "PAFM[mbar]": ["pafm", "afmpressure", "afmp", "pressureafm"],
-    "PPRP[mbar]": ["prep", "pprep", "preppressure", "prerp", "pressureprep", "preparation", "ppreparation", "preparationpressure", "ppreparation", "pressurepreparation"],
-    "PROU[mbar]": ["rou", "prou", "roupressure", "pressurerou", "roughing", "proughing", "roughingpressure", "proughing", "pressureroughing"],
+    "PPRP[mbar]": ["prep", "pprep", "preppressure", "prerp", "pressureprep", "preparation", "ppreparation", "preparationpressure", "pressurepreparation"],
+    "PROU[mbar]": ["rou", "prou", "roupressure", "pressurerou", "roughing", "proughing", "roughingpressure", "pressureroughing"],
     "TAFM[K]": ["tafm", "afm", "temp", "t", "afmtemperature", "afmt", "temperatureafm", "afmtemp", "tempafm"],
     "TCRY[K]": ["tcryo", "tempcryo", "tc", "cryotemperature", "cryot", "temperaturecryo", "cryotemp", "cryo", "tcry"],
     "TSAM[C]": ["tsample", "tsam", "tempsample", "ts", "sampletemperature", "samplet", "temperaturesample", "sampletemp", "sample"],
@@ -131,29 +137,30 @@ ERROR_LOWERTHAN_VALUES = {
 ERROR_LOWERTHAN_DEFAULT = "ERROR_lowerthan"
 ERROR_UNKNOWN_VALUES = "ERROR_unknown_values"
 
-# configuration will be saved to this file and loaded on startup
+# configuration (errors and user settings) will be saved to this file as a pickle and loaded on startup
 USER_CONFIG_FILE = ("config_state.pickle")
+CONFIG_SAVE_EVERY_SECONDS = 120  # changes are saved at most every n seconds (and when the bot is stopped)
 
 # no error messages during office hours
 QUIET_TIMES = True
-QUIET_TIMES_WEEKDAYS = [0, 1, 2, 3, 4]  # Mon to Fri
+QUIET_TIMES_WEEKDAYS = frozenset([0, 1, 2, 3, 4])  # Mon to Fri
 QUIET_TIMES_HOURS_START = 8.0
 QUIET_TIMES_HOURS_END = 18.0
 
 LOGGING_FILENAME = ("logs/log_%Y-%m.log")  # filename for logging of app information, errors and warnings
 LOGGING_ERROR_EVERY_MINUTES = 15  # write warnings to log every n minutes
 
-STATUS_DEFAULT_COLUMNS = ["PAFM[mbar]", "PPRP[mbar]", "TAFM[K]", "LHE[mm]"]
+STATUS_DEFAULT_COLUMNS = ("PAFM[mbar]", "PPRP[mbar]", "TAFM[K]", "LHE[mm]")
 STATUS_SLOPE_DEFAULT_FROM_HOURS = 0.1  # slope in status message is displayed based on a fit this many hours back
 
 GRAPH_DEFAULT_DAYS = 0.5  # default range for graphs (i.e. this many days into the past)
-GRAPH_DEFAULT_COLUMNS = ["PAFM[mbar]", "PPRP[mbar]", "TAFM[K]", "TSAM[C]"]
+GRAPH_DEFAULT_COLUMNS = ("PAFM[mbar]", "PPRP[mbar]", "TAFM[K]", "TSAM[C]")
 GRAPH_MAX_POINTS = 2880  # maximum number of points to plot (if we have more data, it will e averaged)
 GRAPH_DAYS_MAX = 31  # maximum number of days to plot
 GRAPH_FIT_DEFAULT_FROM_HOURS = 0.1  # fit in graphs is based on data this many hours back
 GRAPH_FIT_DEFAULT_TO_HOURS = 2   # fit in graphs extends this many hours into the future
 GRAPH_FIT_DEFAULT_ORDER = 1   # default fit order for polynomial fit in graphs
-GRAPH_LOG_COLUMNS = ["PAFM[mbar]", "PPRP[mbar]"]  # use logarothmic y-scale for these indices
+GRAPH_LOG_COLUMNS = frozenset(["PAFM[mbar]", "PPRP[mbar]"])  # use logarothmic y-scale for these indices
 # ignore values smaller or equal than the values given here (errors can be encoded as negative values)
 GRAPH_IGNORE_LOWERTHAN = {
     "PAFM[mbar]": -1000,
@@ -209,7 +216,7 @@ WARNING_NAMES = {
     "ERROR_nolog_pressure_afm": "Nolog-AFM-pressure",
     "ERROR_nolog_pressure_prep": "Nolog-Prep-pressure",
     "ERROR_nolog_pressure_roughing": "Nolog-Roughing-pressure",
-    "ERROR_nolog_temperature_afm": "Nolog-AFM-temperature-pressure",
+    "ERROR_nolog_temperature_afm": "Nolog-AFM-temperature",
     "ERROR_pressure_afm": "AFM-pressure",
     "ERROR_pressure_prep": "Prep-pressure",
     "ERROR_pressure_roughing": "Roughing-pressure",
@@ -277,8 +284,8 @@ WARNING_OFF_MESSAGES = {
 
 WARNING_OFF_MESSAGE_ONLY_QUIET = " _For quiet hours._"
 
-# text units, for lists a random element will be picked
-TEXTS_UNKNOWN_COMMAND = [
+# text units, for tuples a random element will be picked
+TEXTS_UNKNOWN_COMMAND = (
     "What?",
     "Whaaaaat?",
     u"\U0001F595",
@@ -292,10 +299,10 @@ TEXTS_UNKNOWN_COMMAND = [
     "If you don't have the right equipment for the job, you just have to make it yourself.",
     "Well, sometimes things are hidden under the surface... You just gotta know how to bring 'em out.",
     "Only a fool is sure of anything, a wise man keeps on guessing.",
-]
-TEXTS_START = [
+)
+TEXTS_START = (
     "Greetings, Professor Falken.",
-    "Hello, friend. Hello, friend. That's lame. Maybe I should give you a name. But that’s a slippery slope. You’re only in my head. We have to remember that."
+    "Hello, friend. Hello, friend. That's lame. Maybe I should give you a name. But that’s a slippery slope. You’re only in my head. We have to remember that.",
     "No rest for the wicked.",
     "Every day we change the world. But to change the world in a way that means anything that takes more time than most people have. It never happens all at once. It's slow. It's methodical. It's exhausting.",
     "A man once said: 'When you make a friend, you take on a responsibility'.",
@@ -306,8 +313,8 @@ TEXTS_START = [
     u"\U0001F596",
     u"\U0001F44B",
     u"\U0001F590",
-]
-TEXTS_ERROR = [
+)
+TEXTS_ERROR = (
     "Something went wrong.",
     u"\U0001F4A9",
     "A strange game. The only winning move is not to play.",
@@ -319,4 +326,4 @@ TEXTS_ERROR = [
     # "It's not that I am out of moves, it's that you’re not worth one.",
     "Any problem can be solved with a little ingenuity.",
     # "I think there's a fault in my code. These voices won’t leave me alone.",
-]
+)